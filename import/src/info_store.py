@@ -4,9 +4,11 @@ from __future__ import annotations
 
 import copy
 import json
+import os
+import sys
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 from ledger_engine import (
     DuplicateUniqueCodeError,
@@ -28,16 +30,39 @@ UPLOAD_NS = "uploadinfos"
 PDF_NS = "pdfinfos"
 
 REQUIRED_UPLOAD_STAGE_OBJECTS = ("download", "wayback", "archive")
+UPLOAD_STAGE_OBJECTS = ("download", "wayback", "archive", "hf")
+
+# Partition files are written with sorted keys so diffs stay stable; rows can carry
+# arbitrary nested keys (fonts, stage metadata), so the order is not fixed per schema.
+_ROW_ENCODER = json.JSONEncoder(ensure_ascii=False, sort_keys=True)
+
+INTERNED_ROW_FIELDS = ("state", "status", "department_code", "first_seen_run_type")
+
+URL_MUTABLE_FIELDS = frozenset(
+    {
+        "title",
+        "department_name",
+        "department_code",
+        "gr_date",
+        "source_url",
+        "last_seen_crawl_date",
+    }
+)
+URL_IMMUTABLE_FIELDS = frozenset(
+    {"record_key", "unique_code", "created_at_utc", "first_seen_crawl_date", "first_seen_run_type"}
+)
 
 
 @dataclass(frozen=True)
 class RecordLocation:
+    # One instance per indexed row and namespace; slots keep the index compact.
+    __slots__ = ("partition", "index")
+
     partition: str
     index: int
 
 
-def _namespace_sort_key(file_path: Path) -> tuple[int, int, str]:
-    stem = file_path.stem
+def _namespace_sort_key(stem: str) -> tuple[int, int, str]:
     if stem.isdigit():
         return (0, -int(stem), stem)
     if stem == "unknown":
@@ -45,6 +70,20 @@ def _namespace_sort_key(file_path: Path) -> tuple[int, int, str]:
     return (1, 0, stem)
 
 
+def _intern_row_values(row: dict[str, Any]) -> None:
+    # Enum-like values repeat across every row of a ledger; share one str object each.
+    for key in INTERNED_ROW_FIELDS:
+        value = row.get(key)
+        if type(value) is str:
+            row[key] = sys.intern(value)
+    for stage in UPLOAD_STAGE_OBJECTS:
+        stage_obj = row.get(stage)
+        if type(stage_obj) is dict:
+            status = stage_obj.get("status")
+            if type(status) is str:
+                stage_obj["status"] = sys.intern(status)
+
+
 def _deepcopy_obj(value: Any) -> Any:
     return copy.deepcopy(value)
 
@@ -108,6 +147,12 @@ class InfoStore:
             UPLOAD_NS: {},
             PDF_NS: {},
         }
+        # Sorted partition stems per namespace, kept in sync by _write_partition.
+        self._partitions: dict[str, list[str]] = {
+            URL_NS: [],
+            UPLOAD_NS: [],
+            PDF_NS: [],
+        }
         self.refresh_index()
 
     @staticmethod
@@ -164,14 +209,15 @@ class InfoStore:
         path = self._partition_path(namespace, partition)
         rows: list[dict[str, Any]] = []
         if path.exists():
-            with path.open("r", encoding="utf-8") as handle:
-                for line in handle:
-                    text = line.strip()
-                    if not text:
-                        continue
-                    obj = json.loads(text)
-                    if isinstance(obj, dict):
-                        rows.append(obj)
+            # One bulk read split on bytes. Lines are decoded explicitly rather than handed to
+            # json.loads as bytes, whose per-call encoding detection makes that the slower path.
+            for line in path.read_bytes().splitlines():
+                if not line or line.isspace():
+                    continue
+                obj = json.loads(line.decode("utf-8"))
+                if isinstance(obj, dict):
+                    _intern_row_values(obj)
+                    rows.append(obj)
         cache[partition] = rows
         return rows
 
@@ -179,19 +225,30 @@ class InfoStore:
         path = self._partition_path(namespace, partition)
         path.parent.mkdir(parents=True, exist_ok=True)
         temp_path = path.with_name(f".{path.name}.tmp")
-        with temp_path.open("w", encoding="utf-8") as handle:
-            for row in rows:
-                handle.write(json.dumps(row, ensure_ascii=False, sort_keys=True))
-                handle.write("\n")
+        encode = _ROW_ENCODER.encode
+        payload = "".join(f"{encode(row)}\n" for row in rows)
+        temp_path.write_bytes(payload.encode("utf-8"))
         temp_path.replace(path)
         self._partition_cache[namespace][partition] = rows
+        known = self._partitions[namespace]
+        if partition not in known and self._is_partition_allowed(partition):
+            known.append(partition)
+            known.sort(key=_namespace_sort_key)
+
+    def _scan_partitions(self, namespace: str) -> list[str]:
+        stems: set[str] = set()
+        with os.scandir(self._ns_dir(namespace)) as entries:
+            for entry in entries:
+                name = entry.name
+                if not name.endswith(".jsonl"):
+                    continue
+                stem = name[: -len(".jsonl")]
+                if stem and self._is_partition_allowed(stem):
+                    stems.add(stem)
+        return sorted(stems, key=_namespace_sort_key)
 
     def _list_partitions_for_ns(self, namespace: str) -> list[str]:
-        path = self._ns_dir(namespace)
-        return sorted(
-            {item.stem for item in path.glob("*.jsonl") if self._is_partition_allowed(item.stem)},
-            key=lambda name: _namespace_sort_key(Path(f"{name}.jsonl")),
-        )
+        return list(self._partitions[namespace])
 
     def list_partitions(self) -> list[str]:
         return self._list_partitions_for_ns(URL_NS)
@@ -203,29 +260,29 @@ class InfoStore:
         url_dir = root_dir / URL_NS
         return sorted(
             {item.stem for item in url_dir.glob("*.jsonl")},
-            key=lambda name: _namespace_sort_key(Path(f"{name}.jsonl")),
+            key=_namespace_sort_key,
         )
 
     def refresh_index(self) -> None:
         for ns in (URL_NS, UPLOAD_NS, PDF_NS):
             self._partition_cache[ns] = {}
             self._index[ns] = {}
-            for file_path in sorted(self._ns_dir(ns).glob("*.jsonl"), key=_namespace_sort_key):
-                partition = file_path.stem
-                if not self._is_partition_allowed(partition):
-                    continue
+            self._partitions[ns] = self._scan_partitions(ns)
+            ns_index = self._index[ns]
+            row_key = self._row_key
+            for partition in self._partitions[ns]:
                 rows = self._read_partition(ns, partition)
                 for idx, row in enumerate(rows):
-                    key = self._row_key(row)
+                    key = row_key(row)
                     if not key:
                         continue
-                    if key in self._index[ns]:
-                        existing = self._index[ns][key]
+                    existing = ns_index.get(key)
+                    if existing is not None:
                         raise DuplicateUniqueCodeError(
                             f"Duplicate record_key={key} in {ns} partitions "
                             f"{existing.partition} and {partition}"
                         )
-                    self._index[ns][key] = RecordLocation(partition=partition, index=idx)
+                    ns_index[key] = RecordLocation(partition=partition, index=idx)
 
     def _reindex_partition(self, namespace: str, partition: str) -> None:
         ns_index = self._index[namespace]
@@ -315,22 +372,13 @@ class InfoStore:
         }
 
     def _apply_url_patch(self, target: dict[str, Any], incoming: dict[str, Any], *, is_insert: bool) -> None:
-        mutable = {
-            "title",
-            "department_name",
-            "department_code",
-            "gr_date",
-            "source_url",
-            "last_seen_crawl_date",
-        }
-        immutable = {"record_key", "unique_code", "created_at_utc", "first_seen_crawl_date", "first_seen_run_type"}
         for key, value in incoming.items():
-            if key in immutable and not is_insert:
+            if key in URL_IMMUTABLE_FIELDS and not is_insert:
                 existing = target.get(key)
                 if existing not in (None, "", value):
                     raise ImmutableFieldUpdateError(f"Cannot change immutable field: {key}")
                 continue
-            if key in mutable and value is not None:
+            if key in URL_MUTABLE_FIELDS and value is not None:
                 target[key] = _deepcopy_obj(value)
 
     def _upload_attempt(self, upload_row: dict[str, Any], stage: str) -> int:
@@ -340,32 +388,46 @@ class InfoStore:
         return 0
 
     def _apply_upload_patch(self, target: dict[str, Any], incoming: dict[str, Any], now_text: str) -> None:
-        if "state" in incoming and incoming.get("state") is not None:
-            target["state"] = _normalize_text(incoming.get("state")) or target.get("state", "FETCHED")
-
-        if "attempt_counts" in incoming and isinstance(incoming.get("attempt_counts"), dict):
-            attempts = incoming["attempt_counts"]
+        # Rows are JSON-shaped, so exact type checks are enough here.
+        setdefault = target.setdefault
+        incoming_get = incoming.get
+
+        state_value = incoming_get("state")
+        if state_value is not None:
+            target["state"] = _normalize_text(state_value) or target.get("state", "FETCHED")
+
+        attempts = incoming_get("attempt_counts")
+        if type(attempts) is dict:
+            # Attempt counts are almost always ints already; only fall back to _to_int otherwise.
+            attempts_get = attempts.get
             for stage in REQUIRED_UPLOAD_STAGE_OBJECTS:
-                stage_obj = target.setdefault(stage, {})
-                if isinstance(stage_obj, dict):
-                    stage_obj["attempts"] = _to_int(attempts.get(stage), _to_int(stage_obj.get("attempts"), 0))
-            hf_obj = target.setdefault("hf", {})
-            if isinstance(hf_obj, dict):
-                hf_stage_value = attempts.get("hf", attempts.get("lfs", hf_obj.get("attempts", 0)))
-                hf_obj["attempts"] = _to_int(hf_stage_value, _to_int(hf_obj.get("attempts"), 0))
-
-        for stage in ("download", "wayback", "archive", "hf"):
-            value = incoming.get(stage)
-            if isinstance(value, dict):
-                stage_obj = target.setdefault(stage, {})
-                if isinstance(stage_obj, dict):
+                stage_obj = setdefault(stage, {})
+                if type(stage_obj) is dict:
+                    current = stage_obj.get("attempts", 0)
+                    if type(current) is not int:
+                        current = _to_int(current, 0)
+                    value = attempts_get(stage)
+                    stage_obj["attempts"] = value if type(value) is int else _to_int(value, current)
+            hf_obj = setdefault("hf", {})
+            if type(hf_obj) is dict:
+                current = hf_obj.get("attempts", 0)
+                if type(current) is not int:
+                    current = _to_int(current, 0)
+                value = attempts_get("hf", attempts_get("lfs", current))
+                hf_obj["attempts"] = value if type(value) is int else _to_int(value, current)
+
+        for stage in UPLOAD_STAGE_OBJECTS:
+            value = incoming_get(stage)
+            if type(value) is dict:
+                stage_obj = setdefault(stage, {})
+                if type(stage_obj) is dict:
                     for key, stage_value in value.items():
                         stage_obj[key] = _deepcopy_obj(stage_value)
 
         if "lfs_path" in incoming:
-            hf_obj = target.setdefault("hf", {})
-            if isinstance(hf_obj, dict):
-                path_value = incoming.get("lfs_path")
+            hf_obj = setdefault("hf", {})
+            if type(hf_obj) is dict:
+                path_value = incoming_get("lfs_path")
                 normalized = _normalize_text(path_value) if path_value is not None else ""
                 hf_obj["path"] = normalized if normalized else None
                 hf_obj["status"] = "success" if hf_obj["path"] else "not_attempted"
@@ -421,19 +483,27 @@ class InfoStore:
 
         if loc.partition == partition:
             rows = self._read_partition(namespace, partition)
+            if rows[loc.index] == row:
+                return
             rows[loc.index] = row
             rows.sort(key=lambda item: self._row_key(item))
             self._write_partition(namespace, partition, rows)
             self._reindex_partition(namespace, partition)
             return
 
+        # The index points at the exact source row, and keys are unique per namespace,
+        # so the move only has to splice that row out and shift the rows after it.
+        ns_index = self._index[namespace]
         source_rows = self._read_partition(namespace, loc.partition)
-        source_rows = [item for item in source_rows if self._row_key(item) != record_key]
+        del source_rows[loc.index]
         self._write_partition(namespace, loc.partition, source_rows)
-        self._reindex_partition(namespace, loc.partition)
+        del ns_index[record_key]
+        for idx in range(loc.index, len(source_rows)):
+            key = self._row_key(source_rows[idx])
+            if key:
+                ns_index[key] = RecordLocation(partition=loc.partition, index=idx)
 
         target_rows = self._read_partition(namespace, partition)
-        target_rows = [item for item in target_rows if self._row_key(item) != record_key]
         target_rows.append(row)
         target_rows.sort(key=lambda item: self._row_key(item))
         self._write_partition(namespace, partition, target_rows)
@@ -446,25 +516,32 @@ class InfoStore:
         upload_row: dict[str, Any] | None,
         pdf_row: dict[str, Any] | None,
     ) -> dict[str, Any]:
-        row: dict[str, Any] = _deepcopy_obj(url_row)
+        # find() passes rows from _find_row, which are already private copies,
+        # so the merged record reuses them instead of deep-copying a second time.
+        row: dict[str, Any] = url_row
         row["record_key"] = record_key
         row["unique_code"] = _normalize_text(url_row.get("unique_code")) or record_key
 
         if upload_row is None:
             upload_row = self._default_upload_row(record_key, _normalize_text(url_row.get("updated_at_utc")) or utc_now_text())
-        else:
-            upload_row = _deepcopy_obj(upload_row)
-
-        state = _normalize_text(upload_row.get("state")) or "FETCHED"
-        download = upload_row.get("download") if isinstance(upload_row.get("download"), dict) else {}
-        wayback = upload_row.get("wayback") if isinstance(upload_row.get("wayback"), dict) else {}
-        archive = upload_row.get("archive") if isinstance(upload_row.get("archive"), dict) else {}
-        hf = upload_row.get("hf") if isinstance(upload_row.get("hf"), dict) else {}
 
-        download = dict(download)
+        upload_get = upload_row.get
+        state = _normalize_text(upload_get("state")) or "FETCHED"
+        download = upload_get("download")
+        wayback = upload_get("wayback")
+        archive = upload_get("archive")
+        hf = upload_get("hf")
+        download = dict(download) if isinstance(download, dict) else {}
+        if not isinstance(wayback, dict):
+            wayback = {}
+        if not isinstance(archive, dict):
+            archive = {}
+        if not isinstance(hf, dict):
+            hf = {}
+
+        hf_path = hf.get("path")
         if "path" not in download:
-            path = hf.get("path")
-            download["path"] = path if isinstance(path, str) else ""
+            download["path"] = hf_path if isinstance(hf_path, str) else ""
         if "hash" not in download:
             hash_value = hf.get("hash")
             download["hash"] = hash_value if isinstance(hash_value, str) else ""
@@ -476,8 +553,7 @@ class InfoStore:
         row["wayback"] = wayback
         row["archive"] = archive
         row["hf"] = hf
-        path_value = hf.get("path")
-        row["lfs_path"] = path_value if isinstance(path_value, str) and path_value.strip() else None
+        row["lfs_path"] = hf_path if isinstance(hf_path, str) and hf_path.strip() else None
         row["attempt_counts"] = {
             "download": _to_int(download.get("attempts"), 0),
             "wayback": _to_int(wayback.get("attempts"), 0),
@@ -515,6 +591,11 @@ class InfoStore:
                 records.append(found)
         return records
 
+    def iter_upload_rows(self) -> Iterator[dict[str, Any]]:
+        # Rows come straight from the partition cache loaded by refresh_index; callers must not mutate them.
+        for partition in self._partitions[UPLOAD_NS]:
+            yield from self._read_partition(UPLOAD_NS, partition)
+
     def find(self, unique_code: str) -> dict[str, Any] | None:
         record_key = _normalize_text(unique_code)
         if not record_key:
@@ -622,8 +703,10 @@ class InfoStore:
                         f"record_key={record_key} current_partition={url_loc.partition} target_partition={target_partition}"
                     )
 
-                url_rows[url_loc.index] = url_row
-                touched_partitions.add((URL_NS, target_partition))
+                # Upload-only patches (e.g. hf paths) leave the URL row as-is; skip rewriting its partition.
+                if url_row != current_url_row:
+                    url_rows[url_loc.index] = url_row
+                    touched_partitions.add((URL_NS, target_partition))
 
                 has_upload_patch = self._has_upload_patch(record)
                 upload_loc = self._index[UPLOAD_NS].get(record_key)
@@ -786,9 +869,12 @@ class InfoStore:
             )
             self._upsert_namespace_row(PDF_NS, record_key, target_partition, pdf_row)
         else:
-            current_pdf = self._find_row(PDF_NS, record_key)
-            if current_pdf is not None:
-                self._upsert_namespace_row(PDF_NS, record_key, target_partition, current_pdf)
+            # Without a pdf_info patch the pdf row only needs to follow a partition move.
+            pdf_loc = self._index[PDF_NS].get(record_key)
+            if pdf_loc is not None and pdf_loc.partition != target_partition:
+                current_pdf = self._find_row(PDF_NS, record_key)
+                if current_pdf is not None:
+                    self._upsert_namespace_row(PDF_NS, record_key, target_partition, current_pdf)
 
         return UpsertResult(operation="updated", partition=target_partition, unique_code=record_key)
 
@@ -804,17 +890,18 @@ class InfoStore:
         has_wayback_url: bool | None = None,
     ) -> UpsertResult:
         record_key = _normalize_text(unique_code)
-        existing = self.find(record_key)
-        if existing is None:
+        url_loc = self._index[URL_NS].get(record_key)
+        if url_loc is None:
             raise RecordNotFoundError(f"Record not found: {record_key}")
 
         metadata = metadata or {}
-        url_partition = self._index[URL_NS][record_key].partition
+        url_partition = url_loc.partition
         now_text = utc_now_text()
 
         upload_row = self._find_row(UPLOAD_NS, record_key)
         if upload_row is None:
-            created_at = _normalize_text(existing.get("created_at_utc")) or now_text
+            url_row = self._read_partition(URL_NS, url_partition)[url_loc.index]
+            created_at = _normalize_text(url_row.get("created_at_utc")) or now_text
             upload_row = self._default_upload_row(record_key, created_at)
 
         stage_obj = upload_row.get(stage)
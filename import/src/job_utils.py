@@ -4,22 +4,37 @@ from __future__ import annotations
 
 import hashlib
 import json
+import re
+import sys
 from datetime import date, datetime, timedelta, timezone
 from dataclasses import dataclass
+from operator import attrgetter
 from pathlib import Path
-from typing import Any, Generic, Iterable, Sequence, TypeVar
+from typing import Any, Generic, Iterable, Iterator, Sequence, TypeVar
 
 from info_store import InfoStore as LedgerStore
 
 
 @dataclass(frozen=True)
 class StageRecord:
+    # One instance per selected record; slots avoid a per-instance __dict__.
+    __slots__ = ("unique_code", "record")
+
     unique_code: str
     record: dict[str, Any]
 
 
 TReport = TypeVar("TReport")
 
+# Directories already created by ensure_parent_dir in this process.
+_ENSURED_DIRS: set[Path] = set()
+
+SHA1_READ_SIZE = 4 * 1024 * 1024
+# Probed in order; the most recently refreshed date comes first.
+LOOKBACK_DATE_FIELDS = ("last_seen_crawl_date", "first_seen_crawl_date", "gr_date")
+# D-M-YYYY or D/M/YYYY, same separator twice; what the old strptime formats accepted.
+_DMY_RE = re.compile(r"(\d{1,2})([-/])(\d{1,2})\2(\d{4})", re.ASCII)
+
 
 @dataclass
 class JobRunResult(Generic[TReport]):
@@ -31,17 +46,26 @@ class JobRunResult(Generic[TReport]):
         return bool(self.fatal_error)
 
 
-def chunked(items: Sequence[str], chunk_size: int) -> list[list[str]]:
+def chunked(items: Sequence[str], chunk_size: int) -> Iterator[Sequence[str]]:
     size = max(1, int(chunk_size))
-    return [list(items[index : index + size]) for index in range(0, len(items), size)]
+    for index in range(0, len(items), size):
+        yield items[index : index + size]
+
+
+def _iter_json_codes(path: Path) -> Iterator[Any]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(data, list):
+        yield from data
+    elif isinstance(data, dict):
+        yield from data.keys()
+    else:
+        raise ValueError(f"Unsupported JSON structure in codes file: {path}")
 
 
 def load_code_filter(codes: Iterable[str], codes_file: str | None) -> set[str]:
+    # The filter set is built once and lives for the whole run, so its codes are interned.
     code_set: set[str] = set()
-    for code in codes:
-        value = str(code).strip()
-        if value:
-            code_set.add(value)
+    code_set.update(sys.intern(value) for value in (str(code).strip() for code in codes) if value)
 
     if not codes_file:
         return code_set
@@ -51,25 +75,12 @@ def load_code_filter(codes: Iterable[str], codes_file: str | None) -> set[str]:
         raise FileNotFoundError(f"codes file not found: {path}")
 
     if path.suffix.lower() == ".json":
-        data = json.loads(path.read_text(encoding="utf-8"))
-        if isinstance(data, list):
-            for item in data:
-                value = str(item).strip()
-                if value:
-                    code_set.add(value)
-        elif isinstance(data, dict):
-            for key in data.keys():
-                value = str(key).strip()
-                if value:
-                    code_set.add(value)
-        else:
-            raise ValueError(f"Unsupported JSON structure in codes file: {path}")
+        code_set.update(sys.intern(value) for value in (str(item).strip() for item in _iter_json_codes(path)) if value)
     else:
-        for line in path.read_text(encoding="utf-8").splitlines():
-            value = line.strip()
-            if not value or value.startswith("#"):
-                continue
-            code_set.add(value)
+        with path.open("r", encoding="utf-8", buffering=1 << 16) as handle:
+            code_set.update(
+                sys.intern(value) for value in (line.strip() for line in handle) if value and not value.startswith("#")
+            )
 
     return code_set
 
@@ -77,11 +88,15 @@ def load_code_filter(codes: Iterable[str], codes_file: str | None) -> set[str]:
 def parse_state_list(values: Iterable[str] | None) -> set[str]:
     if not values:
         return set()
-    return {value.strip() for value in values if value and value.strip()}
+    return {stripped for value in values if value and (stripped := value.strip())}
 
 
 def _parse_date(value: Any) -> date | None:
-    text = str(value or "").strip()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = value.strip() if isinstance(value, str) else str(value or "").strip()
     if not text:
         return None
     # Handle plain ISO date and ISO datetime values.
@@ -91,27 +106,51 @@ def _parse_date(value: Any) -> date | None:
             return date.fromisoformat(candidate)
         except ValueError:
             return None
-    for fmt in ("%d-%m-%Y", "%d/%m/%Y"):
+    # Zero-padded DD-MM-YYYY / DD/MM/YYYY without going through strptime. isdigit() accepts
+    # non-ASCII digits, which strptime rejects, so the fast path is ASCII only.
+    if (
+        len(text) == 10
+        and text.isascii()
+        and text[2] in "-/"
+        and text[5] == text[2]
+        and text[:2].isdigit()
+        and text[3:5].isdigit()
+        and text[6:].isdigit()
+    ):
         try:
-            return datetime.strptime(text, fmt).date()
+            return date(int(text[6:]), int(text[3:5]), int(text[:2]))
         except ValueError:
-            continue
-    return None
+            return None
+    match = _DMY_RE.fullmatch(text)
+    if match is None:
+        return None
+    try:
+        return date(int(match[4]), int(match[3]), int(match[1]))
+    except ValueError:
+        return None
 
 
-def is_record_within_lookback(record: dict[str, Any], lookback_days: int) -> bool:
+def _lookback_cutoff(lookback_days: int) -> date | None:
     days = max(0, int(lookback_days))
     if days == 0:
-        return True
+        return None
+    return datetime.now(timezone.utc).date() - timedelta(days=days)
 
-    cutoff = datetime.now(timezone.utc).date() - timedelta(days=days)
-    for field_name in ("last_seen_crawl_date", "first_seen_crawl_date", "gr_date"):
-        parsed = _parse_date(record.get(field_name))
+
+def _is_record_within_cutoff(record: dict[str, Any], cutoff: date) -> bool:
+    get = record.get
+    for field_name in LOOKBACK_DATE_FIELDS:
+        parsed = _parse_date(get(field_name))
         if parsed is not None and parsed >= cutoff:
             return True
     return False
 
 
+def is_record_within_lookback(record: dict[str, Any], lookback_days: int) -> bool:
+    cutoff = _lookback_cutoff(lookback_days)
+    return cutoff is None or _is_record_within_cutoff(record, cutoff)
+
+
 def filter_stage_records(
     store: LedgerStore,
     *,
@@ -124,48 +163,56 @@ def filter_stage_records(
     selected: list[StageRecord] = []
 
     codes = code_filter or set()
+    cutoff = _lookback_cutoff(lookback_days)
     for record in store.iter_records():
         unique_code = str(record.get("unique_code", "")).strip()
         if not unique_code:
             continue
         if codes and unique_code not in codes:
             continue
-        if not is_record_within_lookback(record, lookback_days):
+        if cutoff is not None and not _is_record_within_cutoff(record, cutoff):
             continue
-        state = str(record.get("state", "")).strip()
-        # if allowed_states and state not in allowed_states:
+        # if allowed_states and str(record.get("state", "")).strip() not in allowed_states:
         #     continue
-        attempts = record.get("attempt_counts", {})
-        stage_attempts = attempts.get(stage, 0) if isinstance(attempts, dict) else 0
+        try:
+            stage_attempts = record.get("attempt_counts", {}).get(stage, 0)
+        except AttributeError:
+            # Malformed rows where attempt_counts is not an object.
+            stage_attempts = 0
         if isinstance(stage_attempts, int) and stage_attempts >= max_attempts:
             continue
         selected.append(StageRecord(unique_code=unique_code, record=record))
-    selected.sort(key=lambda item: item.unique_code)
+    selected.sort(key=attrgetter("unique_code"))
     return selected
 
 
 def detect_service_failure(status_code: int | None, exception: Exception | None = None) -> bool:
-    if exception is not None:
-        return True
-    if status_code is None:
-        return False
-    if status_code == 429:
-        return True
-    return status_code >= 500
+    return exception is not None or (status_code is not None and (status_code == 429 or status_code >= 500))
 
 
 def ensure_parent_dir(path: Path) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
+    parent = path.parent
+    if parent in _ENSURED_DIRS:
+        return
+    parent.mkdir(parents=True, exist_ok=True)
+    _ENSURED_DIRS.add(parent)
 
 
 def sha1_file(file_path: Path) -> str:
-    digest = hashlib.sha1()
-    with file_path.open("rb") as handle:
-        while True:
-            chunk = handle.read(1024 * 1024)
-            if not chunk:
-                break
-            digest.update(chunk)
+    # Unbuffered: both paths read straight into their own buffer, skipping BufferedReader copies.
+    with file_path.open("rb", buffering=0) as handle:
+        if hasattr(hashlib, "file_digest"):
+            # Python 3.11+: the read/update loop runs in C.
+            digest = hashlib.file_digest(handle, "sha1")
+        else:
+            digest = hashlib.sha1()
+            buffer = bytearray(SHA1_READ_SIZE)
+            view = memoryview(buffer)
+            while True:
+                size = handle.readinto(buffer)
+                if not size:
+                    break
+                digest.update(view[:size])
     return digest.hexdigest().upper()
 
 
@@ -181,13 +228,15 @@ def print_stage_report(
     stopped_early: bool,
     extras: dict[str, Any] | None = None,
 ) -> None:
-    print(f"{label}:")
-    print(f"  selected: {selected}")
-    print(f"  processed: {processed}")
-    print(f"  success: {success}")
-    print(f"  failed: {failed}")
-    print(f"  skipped: {skipped}")
-    for key, value in (extras or {}).items():
-        print(f"  {key}: {value}")
-    print(f"  service_failures: {service_failures}")
-    print(f"  stopped_early: {stopped_early}")
+    lines = [
+        f"{label}:",
+        f"  selected: {selected}",
+        f"  processed: {processed}",
+        f"  success: {success}",
+        f"  failed: {failed}",
+        f"  skipped: {skipped}",
+    ]
+    lines.extend(f"  {key}: {value}" for key, value in (extras or {}).items())
+    lines.append(f"  service_failures: {service_failures}")
+    lines.append(f"  stopped_early: {stopped_early}")
+    sys.stdout.write("\n".join(lines) + "\n")
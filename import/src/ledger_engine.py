@@ -34,6 +34,7 @@ STAGE_DOWNLOAD = "download"
 STAGE_WAYBACK = "wayback"
 STAGE_ARCHIVE = "archive"
 STAGE_NAMES = {STAGE_DOWNLOAD, STAGE_WAYBACK, STAGE_ARCHIVE}
+STAGE_ORDER = (STAGE_DOWNLOAD, STAGE_WAYBACK, STAGE_ARCHIVE)
 
 IMMUTABLE_FIELDS = {"unique_code", "created_at_utc", "first_seen_crawl_date", "first_seen_run_type"}
 MUTABLE_FIELDS = {
@@ -52,6 +53,11 @@ MUTABLE_FIELDS = {
     "last_seen_crawl_date",
 }
 
+_JSON_SCALAR_TYPES = frozenset({str, int, float, bool, type(None)})
+
+# Partition rows are written with sorted keys so diffs stay stable across runs.
+_ROW_ENCODER = json.JSONEncoder(ensure_ascii=False, sort_keys=True)
+
 ALLOWED_TRANSITIONS: dict[str, set[str]] = {
     STATE_FETCHED: {STATE_FETCHED, STATE_DOWNLOAD_SUCCESS, STATE_DOWNLOAD_FAILED},
     STATE_DOWNLOAD_SUCCESS: {
@@ -88,6 +94,19 @@ ALLOWED_TRANSITIONS: dict[str, set[str]] = {
     },
 }
 
+# ALLOWED_TRANSITIONS packed into one bit per state: validate_transition tests a single AND.
+_STATE_BITS = {state: 1 << position for position, state in enumerate(sorted(ALLOWED_STATES))}
+_TRANSITION_MASKS = {
+    state: sum(_STATE_BITS[next_state] for next_state in next_states)
+    for state, next_states in ALLOWED_TRANSITIONS.items()
+}
+
+# Stages whose next state depends only on the outcome: (failed state, succeeded state).
+_STAGE_OUTCOME_STATES = {
+    STAGE_DOWNLOAD: (STATE_DOWNLOAD_FAILED, STATE_DOWNLOAD_SUCCESS),
+    STAGE_WAYBACK: (STATE_WAYBACK_UPLOAD_FAILED, STATE_WAYBACK_UPLOADED),
+}
+
 
 class LedgerError(Exception):
     pass
@@ -126,6 +145,34 @@ class UpsertResult:
     unique_code: str
 
 
+def _clone_json(value: Any) -> Any:
+    # Rows are plain JSON data; rebuilding dicts/lists directly skips deepcopy's memo bookkeeping.
+    value_type = type(value)
+    if value_type is dict:
+        return {key: item if type(item) in _JSON_SCALAR_TYPES else _clone_json(item) for key, item in value.items()}
+    if value_type is list:
+        return [item if type(item) in _JSON_SCALAR_TYPES else _clone_json(item) for item in value]
+    if value_type in _JSON_SCALAR_TYPES:
+        return value
+    return copy.deepcopy(value)
+
+
+def _row_sort_key(row: dict[str, Any]) -> str:
+    return str(row.get("unique_code", ""))
+
+
+def _sorted_insert_position(rows: list[dict[str, Any]], sort_key: str) -> int:
+    # bisect_right over rows already ordered by _row_sort_key; bisect's key= needs 3.10.
+    low, high = 0, len(rows)
+    while low < high:
+        middle = (low + high) // 2
+        if sort_key < _row_sort_key(rows[middle]):
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
 def utc_now_text() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
 
@@ -136,6 +183,14 @@ def parse_iso_date(date_text: Any) -> date | None:
     text = date_text.strip()
     if not text:
         return None
+    # Zero-padded YYYY-MM-DD is the stored form; build the date without going through strptime.
+    if len(text) == 10 and text[4] == "-" and text[7] == "-" and text.isascii():
+        year, month, day = text[:4], text[5:7], text[8:]
+        if year.isdigit() and month.isdigit() and day.isdigit():
+            try:
+                return date(int(year), int(month), int(day))
+            except ValueError:
+                return None
     try:
         return datetime.strptime(text, "%Y-%m-%d").date()
     except ValueError:
@@ -180,10 +235,11 @@ def to_ledger_relative_path(path_value: Any) -> str:
         return ""
     path = Path(text)
     if path.is_absolute():
+        resolved = path.resolve()
         try:
-            return path.resolve().relative_to(Path.cwd()).as_posix()
+            return resolved.relative_to(Path.cwd()).as_posix()
         except ValueError:
-            return path.resolve().as_posix()
+            return resolved.as_posix()
     return path.as_posix()
 
 
@@ -193,14 +249,21 @@ def existing_file_ledger_path(path_value: Any) -> str | None:
         return None
     path = Path(text)
     probe = path if path.is_absolute() else (Path.cwd() / path)
-    if not probe.exists() or not probe.is_file():
+    # is_file() is a single stat and is already False for missing paths.
+    if not probe.is_file():
         return None
     return to_ledger_relative_path(probe)
 
 
-def default_record_template(unique_code: str) -> dict[str, Any]:
-    now_text = utc_now_text()
-    today_text = datetime.now(timezone.utc).date().isoformat()
+def default_record_template(
+    unique_code: str,
+    *,
+    now_text: str | None = None,
+    today_text: str | None = None,
+) -> dict[str, Any]:
+    # A literal builds faster than cloning a prebuilt template (json.loads or a recursive copy).
+    now_text = now_text or utc_now_text()
+    today_text = today_text or datetime.now(timezone.utc).date().isoformat()
     return {
         "unique_code": unique_code,
         "title": "",
@@ -272,10 +335,13 @@ class StateMachine:
 
     @staticmethod
     def validate_transition(current_state: str, next_state: str) -> None:
-        StateMachine.validate_state(current_state)
-        StateMachine.validate_state(next_state)
-        allowed = ALLOWED_TRANSITIONS[current_state]
-        if next_state not in allowed:
+        allowed_mask = _TRANSITION_MASKS.get(current_state)
+        if allowed_mask is None:
+            raise InvalidTransitionError(f"Unknown state: {current_state}")
+        next_bit = _STATE_BITS.get(next_state)
+        if next_bit is None:
+            raise InvalidTransitionError(f"Unknown state: {next_state}")
+        if not allowed_mask & next_bit:
             raise InvalidTransitionError(f"Invalid transition: {current_state} -> {next_state}")
 
     @staticmethod
@@ -288,27 +354,19 @@ class StateMachine:
         has_document: bool = True,
     ) -> str:
         StateMachine.validate_state(current_state)
-        if stage not in STAGE_NAMES:
+        outcome_states = _STAGE_OUTCOME_STATES.get(stage)
+        if outcome_states is not None:
+            return outcome_states[1] if success else outcome_states[0]
+        if stage != STAGE_ARCHIVE:
             raise InvalidTransitionError(f"Unknown stage: {stage}")
 
-        if stage == STAGE_DOWNLOAD:
-            if current_state == STATE_ARCHIVE_UPLOADED_WITHOUT_DOCUMENT:
-                return STATE_DOWNLOAD_SUCCESS if success else STATE_DOWNLOAD_FAILED
-            return STATE_DOWNLOAD_SUCCESS if success else STATE_DOWNLOAD_FAILED
-
-        if stage == STAGE_WAYBACK:
-            return STATE_WAYBACK_UPLOADED if success else STATE_WAYBACK_UPLOAD_FAILED
-
-        if stage == STAGE_ARCHIVE:
-            if not success:
-                return current_state
-            if not has_document:
-                return STATE_ARCHIVE_UPLOADED_WITHOUT_DOCUMENT
-            if has_wayback_url:
-                return STATE_ARCHIVE_UPLOADED_WITH_WAYBACK_URL
-            return STATE_ARCHIVE_UPLOADED_WITHOUT_WAYBACK_URL
-
-        return current_state
+        if not success:
+            return current_state
+        if not has_document:
+            return STATE_ARCHIVE_UPLOADED_WITHOUT_DOCUMENT
+        if has_wayback_url:
+            return STATE_ARCHIVE_UPLOADED_WITH_WAYBACK_URL
+        return STATE_ARCHIVE_UPLOADED_WITHOUT_WAYBACK_URL
 
 
 class LedgerStore:
@@ -317,44 +375,53 @@ class LedgerStore:
         self.ledger_dir.mkdir(parents=True, exist_ok=True)
         self._partition_cache: dict[str, list[dict[str, Any]]] = {}
         self._index: dict[str, RecordLocation] = {}
+        # Partitions whose file was not written in unique_code order; sorted on first write.
+        self._unsorted_partitions: set[str] = set()
         self.refresh_index()
 
     def refresh_index(self) -> None:
         self._partition_cache = {}
         self._index = {}
+        self._unsorted_partitions = set()
+        index = self._index
         for file_path in sorted(self.ledger_dir.glob("*.jsonl")):
             partition = file_path.stem
             rows = self._read_partition(partition)
-            for index, row in enumerate(rows):
+            for position, row in enumerate(rows):
                 unique_code = row.get("unique_code")
                 if not isinstance(unique_code, str) or not unique_code:
                     continue
-                if unique_code in self._index:
-                    existing = self._index[unique_code]
+                existing = index.get(unique_code)
+                if existing is not None:
                     raise DuplicateUniqueCodeError(
                         f"Duplicate unique_code={unique_code} in partitions {existing.partition} and {partition}"
                     )
-                self._index[unique_code] = RecordLocation(partition=partition, index=index)
-
-    def _reindex_partition(self, partition: str) -> None:
-        stale_codes = [code for code, location in self._index.items() if location.partition == partition]
-        for code in stale_codes:
-            del self._index[code]
+                index[unique_code] = RecordLocation(partition=partition, index=position)
 
+    def _reindex_partition(self, partition: str, start: int = 0) -> None:
+        # Codes only leave a partition when upsert moves them, and that path drops the
+        # entry itself, so only rows whose position changed need a new location.
+        index = self._index
         rows = self._read_partition(partition)
-        for index, row in enumerate(rows):
+        for position in range(start, len(rows)):
+            row = rows[position]
             unique_code = row.get("unique_code")
             if not isinstance(unique_code, str) or not unique_code:
                 continue
-            existing = self._index.get(unique_code)
-            if existing is not None and existing.partition != partition:
-                raise DuplicateUniqueCodeError(
-                    f"Duplicate unique_code={unique_code} in partitions {existing.partition} and {partition}"
-                )
-            self._index[unique_code] = RecordLocation(partition=partition, index=index)
+            existing = index.get(unique_code)
+            if existing is not None:
+                if existing.partition != partition:
+                    raise DuplicateUniqueCodeError(
+                        f"Duplicate unique_code={unique_code} in partitions {existing.partition} and {partition}"
+                    )
+                if existing.index == position:
+                    continue
+            index[unique_code] = RecordLocation(partition=partition, index=position)
 
     def list_partitions(self) -> list[str]:
-        return sorted(self._partition_cache.keys() | {path.stem for path in self.ledger_dir.glob("*.jsonl")})
+        # refresh_index loads every partition file and writes go through the cache,
+        # so the cache keys already cover the directory listing.
+        return sorted(self._partition_cache)
 
     def iter_records(self) -> list[dict[str, Any]]:
         records: list[dict[str, Any]] = []
@@ -379,19 +446,21 @@ class LedgerStore:
         *,
         run_type: str | None = None,
         crawl_date: date | str | None = None,
+        now_text: str | None = None,
     ) -> UpsertResult:
         unique_code = record.get("unique_code")
         if not isinstance(unique_code, str) or not unique_code.strip():
             raise LedgerError("upsert requires non-empty record['unique_code']")
         unique_code = unique_code.strip()
 
-        now_text = utc_now_text()
         normalized_run_type = normalize_run_type(run_type)
         normalized_crawl_date = normalize_crawl_date(crawl_date)
 
         location = self._index.get(unique_code)
         if location is None:
-            new_record = default_record_template(unique_code)
+            # Only inserts stamp the clock, so updates never pay for formatting it.
+            now_text = now_text or utc_now_text()
+            new_record = default_record_template(unique_code, now_text=now_text, today_text=normalized_crawl_date)
             self._apply_mutable_update(new_record, record, is_insert=True)
             new_record["first_seen_run_type"] = normalized_run_type
             new_record["first_seen_crawl_date"] = normalized_crawl_date
@@ -403,16 +472,17 @@ class LedgerStore:
 
             target_partition = partition_for_gr_date(new_record.get("gr_date"))
             rows = self._read_partition(target_partition)
-            rows.append(new_record)
-            rows.sort(key=lambda item: str(item.get("unique_code", "")))
+            resorted = self._sort_unsorted_rows(target_partition, rows)
+            position = _sorted_insert_position(rows, _row_sort_key(new_record))
+            rows.insert(position, new_record)
             self._write_partition(target_partition, rows)
-            self._reindex_partition(target_partition)
+            self._reindex_partition(target_partition, start=0 if resorted else position)
             return UpsertResult(operation="inserted", partition=target_partition, unique_code=unique_code)
 
         source_partition = location.partition
         rows = self._read_partition(source_partition)
         current_record = rows[location.index]
-        updated_record = copy.deepcopy(current_record)
+        updated_record = _clone_json(current_record)
         self._apply_mutable_update(updated_record, record, is_insert=False)
 
         if updated_record.get("state") != current_record.get("state"):
@@ -427,30 +497,37 @@ class LedgerStore:
             if candidate_last_seen and (existing_last_seen is None or candidate_last_seen > existing_last_seen):
                 updated_record["last_seen_crawl_date"] = candidate_last_seen.isoformat()
 
-        self._validate_attempt_counts_non_decreasing(current_record, updated_record)
-        self._validate_attempt_counts(updated_record)
+        self._validate_attempt_counts(updated_record, current_record)
         self._validate_state(updated_record)
 
         target_partition = partition_for_gr_date(updated_record.get("gr_date"))
 
         if target_partition == source_partition:
+            # Re-crawls mostly resend identical rows; leave the partition file alone then.
+            if updated_record == current_record:
+                return UpsertResult(operation="unchanged", partition=target_partition, unique_code=unique_code)
+            # The unique_code is unchanged, so a sorted partition keeps its order.
             rows[location.index] = updated_record
-            rows.sort(key=lambda item: str(item.get("unique_code", "")))
+            resorted = self._sort_unsorted_rows(source_partition, rows)
             self._write_partition(source_partition, rows)
-            self._reindex_partition(source_partition)
+            if resorted:
+                self._reindex_partition(source_partition)
             return UpsertResult(operation="updated", partition=target_partition, unique_code=unique_code)
 
-        source_rows = [row for row in rows if row.get("unique_code") != unique_code]
+        # The index points at the exact source row and unique codes never repeat across
+        # partitions, so the move is one delete in the source and one insert in the target.
+        del rows[location.index]
+        source_resorted = self._sort_unsorted_rows(source_partition, rows)
         target_rows = self._read_partition(target_partition)
-        target_rows = [row for row in target_rows if row.get("unique_code") != unique_code]
-        target_rows.append(updated_record)
-        source_rows.sort(key=lambda item: str(item.get("unique_code", "")))
-        target_rows.sort(key=lambda item: str(item.get("unique_code", "")))
+        target_resorted = self._sort_unsorted_rows(target_partition, target_rows)
+        position = _sorted_insert_position(target_rows, _row_sort_key(updated_record))
+        target_rows.insert(position, updated_record)
 
-        self._write_partition(source_partition, source_rows)
+        self._write_partition(source_partition, rows)
         self._write_partition(target_partition, target_rows)
-        self._reindex_partition(source_partition)
-        self._reindex_partition(target_partition)
+        del self._index[unique_code]
+        self._reindex_partition(source_partition, start=0 if source_resorted else location.index)
+        self._reindex_partition(target_partition, start=0 if target_resorted else position)
         return UpsertResult(operation="moved", partition=target_partition, unique_code=unique_code)
 
     def apply_stage_result(
@@ -471,7 +548,7 @@ class LedgerStore:
         if existing is None:
             raise RecordNotFoundError(f"Record not found: {unique_code}")
 
-        record = copy.deepcopy(existing)
+        record = _clone_json(existing)
         metadata = metadata or {}
         attempts = record.setdefault("attempt_counts", {})
         current_attempts = attempts.get(stage, 0)
@@ -553,50 +630,45 @@ class LedgerStore:
             raise LedgerError("record['state'] must be string")
         StateMachine.validate_state(state)
 
-    def _validate_attempt_counts(self, record: dict[str, Any]) -> None:
+    def _validate_attempt_counts(
+        self,
+        record: dict[str, Any],
+        previous_record: dict[str, Any] | None = None,
+    ) -> None:
         attempts = record.get("attempt_counts")
         if not isinstance(attempts, dict):
             raise LedgerError("record['attempt_counts'] must be object")
-        for stage in STAGE_NAMES:
+        previous_attempts = previous_record.get("attempt_counts") if previous_record is not None else None
+        if not isinstance(previous_attempts, dict):
+            previous_attempts = None
+        for stage in STAGE_ORDER:
             value = attempts.get(stage, 0)
             if not isinstance(value, int):
                 raise LedgerError(f"attempt_counts.{stage} must be int")
+            if previous_attempts is not None:
+                previous_value = previous_attempts.get(stage, 0)
+                if isinstance(previous_value, int) and value < previous_value:
+                    raise LedgerError(f"attempt_counts.{stage} cannot decrease ({previous_value} -> {value})")
             if value < 0 or value > 2:
                 raise LedgerError(f"attempt_counts.{stage} must be in [0,2], got {value}")
 
-    def _validate_attempt_counts_non_decreasing(
-        self,
-        current_record: dict[str, Any],
-        updated_record: dict[str, Any],
-    ) -> None:
-        current_attempts = current_record.get("attempt_counts", {})
-        updated_attempts = updated_record.get("attempt_counts", {})
-        if not isinstance(current_attempts, dict) or not isinstance(updated_attempts, dict):
-            return
-        for stage in STAGE_NAMES:
-            current_value = current_attempts.get(stage, 0)
-            updated_value = updated_attempts.get(stage, 0)
-            if isinstance(current_value, int) and isinstance(updated_value, int) and updated_value < current_value:
-                raise LedgerError(
-                    f"attempt_counts.{stage} cannot decrease ({current_value} -> {updated_value})"
-                )
-
     def _apply_mutable_update(self, target: dict[str, Any], incoming: dict[str, Any], *, is_insert: bool) -> None:
+        # Most incoming keys are mutable, so test that set first; scalars need no copy.
         for key, value in incoming.items():
+            if key in MUTABLE_FIELDS:
+                if value is not None or key == "lfs_path":
+                    target[key] = value if type(value) in _JSON_SCALAR_TYPES else _clone_json(value)
+                continue
+
             if key in IMMUTABLE_FIELDS:
                 if is_insert:
-                    target[key] = copy.deepcopy(value)
+                    target[key] = _clone_json(value)
                 else:
                     existing = target.get(key)
                     if existing is None or existing == "":
-                        target[key] = copy.deepcopy(value)
+                        target[key] = _clone_json(value)
                     elif value != existing:
                         raise ImmutableFieldUpdateError(f"Cannot change immutable field: {key}")
-                continue
-
-            if key in MUTABLE_FIELDS:
-                if value is not None or key == "lfs_path":
-                    target[key] = copy.deepcopy(value)
 
     def _partition_path(self, partition: str) -> Path:
         return self.ledger_dir / f"{partition}.jsonl"
@@ -608,24 +680,36 @@ class LedgerStore:
         file_path = self._partition_path(partition)
         rows: list[dict[str, Any]] = []
         if file_path.exists():
-            with file_path.open("r", encoding="utf-8") as handle:
-                for line in handle:
-                    text = line.strip()
-                    if not text:
-                        continue
-                    obj = json.loads(text)
-                    if isinstance(obj, dict):
-                        rows.append(obj)
+            # Decode per line: json.loads on bytes re-detects the encoding on every call.
+            for line in file_path.read_bytes().splitlines():
+                if not line or line.isspace():
+                    continue
+                obj = json.loads(line.decode("utf-8"))
+                if isinstance(obj, dict):
+                    rows.append(obj)
+        previous_key = ""
+        for row in rows:
+            row_key = _row_sort_key(row)
+            if row_key < previous_key:
+                self._unsorted_partitions.add(partition)
+                break
+            previous_key = row_key
         self._partition_cache[partition] = rows
         return rows
 
+    def _sort_unsorted_rows(self, partition: str, rows: list[dict[str, Any]]) -> bool:
+        if partition not in self._unsorted_partitions:
+            return False
+        rows.sort(key=_row_sort_key)
+        self._unsorted_partitions.discard(partition)
+        return True
+
     def _write_partition(self, partition: str, rows: list[dict[str, Any]]) -> None:
         file_path = self._partition_path(partition)
         file_path.parent.mkdir(parents=True, exist_ok=True)
         temp_path = file_path.with_name(f".{file_path.name}.tmp")
-        with temp_path.open("w", encoding="utf-8") as handle:
-            for row in rows:
-                handle.write(json.dumps(row, ensure_ascii=False, sort_keys=True))
-                handle.write("\n")
+        encode = _ROW_ENCODER.encode
+        payload = "".join(f"{encode(row)}\n" for row in rows)
+        temp_path.write_bytes(payload.encode("utf-8"))
         temp_path.replace(file_path)
         self._partition_cache[partition] = rows
@@ -7,9 +7,20 @@ from pathlib import Path
 
 
 _LOADED_PATHS: set[Path] = set()
+# Walk results per (filename, start_dir), so repeated loads skip the ancestor probes.
+_FOUND_ENV_FILES: dict[tuple[str, Path], Path | None] = {}
 
 
 def _find_env_file(filename: str, start_dir: Path) -> Path | None:
+    cache_key = (filename, start_dir)
+    if cache_key in _FOUND_ENV_FILES:
+        return _FOUND_ENV_FILES[cache_key]
+    found = _walk_for_env_file(filename, start_dir)
+    _FOUND_ENV_FILES[cache_key] = found
+    return found
+
+
+def _walk_for_env_file(filename: str, start_dir: Path) -> Path | None:
     current = start_dir
     while True:
         candidate = current / filename
@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 import argparse
-import json
 import os
 import re
 from dataclasses import dataclass
@@ -15,9 +14,10 @@ from info_store import InfoStore
 from local_env import load_local_env
 
 try:
-    from huggingface_hub import HfApi
+    from huggingface_hub import HfApi, RepoFolder
 except Exception:
     HfApi = None
+    RepoFolder = None
 
 
 LONG_DIGITS_RE = re.compile(r"\d{16,22}")
@@ -82,6 +82,8 @@ def _code_candidates_from_stem(stem: str) -> list[str]:
     text = stem.strip()
     if not text:
         return []
+    if text.isdecimal():
+        return [text] if len(text) <= 22 else [text, text[:22]]
     candidates = [text]
     match = LONG_DIGITS_RE.search(text)
     if match:
@@ -128,18 +130,32 @@ def _list_remote_pdf_paths(hf_repo_id: str, *, hf_token: str, verbose: bool) ->
     _require_hf_hub()
     token = (hf_token or "").strip() or None
     api = HfApi(token=token)
+    file_count = 0
+    pdf_paths: list[str] = []
+    # Walk the paged tree listing directly so only PDF paths are kept in memory.
     try:
-        repo_files = api.list_repo_files(repo_id=hf_repo_id, repo_type="dataset", token=token)
+        for entry in api.list_repo_tree(repo_id=hf_repo_id, repo_type="dataset", recursive=True, token=token):
+            if isinstance(entry, RepoFolder):
+                continue
+            file_count += 1
+            path = entry.path
+            if path.lower().endswith(".pdf"):
+                pdf_paths.append(path)
     except Exception as exc:
         raise RuntimeError(f"Failed to list files from HF dataset repo `{hf_repo_id}`: {exc}") from exc
 
-    pdf_paths = sorted(path for path in repo_files if isinstance(path, str) and path.lower().endswith(".pdf"))
+    pdf_paths.sort()
     if verbose:
-        print(f"[hf] repo_id={hf_repo_id} files={len(repo_files)} pdfs={len(pdf_paths)}")
+        print(f"[hf] repo_id={hf_repo_id} files={file_count} pdfs={len(pdf_paths)}")
     return pdf_paths
 
 
-def _build_pdf_index(pdf_paths: list[str], *, verbose: bool) -> tuple[dict[str, str], set[str], int]:
+def _build_pdf_index(
+    pdf_paths: list[str],
+    *,
+    needed_codes: set[str] | None = None,
+    verbose: bool,
+) -> tuple[dict[str, str], set[str], int]:
     code_to_relpath: dict[str, str] = {}
     ambiguous_codes: set[str] = set()
     scanned = 0
@@ -147,6 +163,8 @@ def _build_pdf_index(pdf_paths: list[str], *, verbose: bool) -> tuple[dict[str,
     for relpath in pdf_paths:
         scanned += 1
         for code in _code_candidates_from_stem(Path(relpath).stem):
+            if needed_codes is not None and code not in needed_codes:
+                continue
             if code in ambiguous_codes:
                 continue
             existing = code_to_relpath.get(code)
@@ -162,83 +180,83 @@ def _build_pdf_index(pdf_paths: list[str], *, verbose: bool) -> tuple[dict[str,
     return code_to_relpath, ambiguous_codes, scanned
 
 
-def _iter_upload_rows(upload_dir: Path):
-    for file_path in sorted(upload_dir.glob("*.jsonl")):
-        with file_path.open("r", encoding="utf-8") as handle:
-            for line in handle:
-                text = line.strip()
-                if not text:
-                    continue
-                try:
-                    obj = json.loads(text)
-                except json.JSONDecodeError:
-                    continue
-                if isinstance(obj, dict):
-                    yield obj
-
-
 def _has_hf_path(row: dict[str, Any]) -> bool:
-    hf = row.get("hf")
-    if not isinstance(hf, dict):
+    # Upload rows always carry an hf object, so direct indexing rarely raises.
+    try:
+        path_value = row["hf"]["path"]
+    except (KeyError, TypeError):
         return False
-    path_value = hf.get("path")
     return isinstance(path_value, str) and bool(path_value.strip())
 
 
+def _collect_missing_hf_path_keys(store: InfoStore, report: BackfillHFPathReport) -> list[str]:
+    missing_keys: list[str] = []
+    # InfoStore has already parsed every upload partition; reuse those rows instead of re-reading the files.
+    for row in store.iter_upload_rows():
+        report.upload_rows_scanned += 1
+
+        record_key = _normalize_text(row.get("record_key") or row.get("unique_code"))
+        if not record_key:
+            continue
+        if _has_hf_path(row):
+            continue
+        missing_keys.append(record_key)
+
+    report.missing_hf_path_rows = len(missing_keys)
+    return missing_keys
+
+
 def run_backfill_hf_path(config: BackfillHFPathConfig) -> BackfillHFPathReport:
     store = InfoStore(config.ledger_dir)
 
     report = BackfillHFPathReport()
+    missing_keys = _collect_missing_hf_path_keys(store, report)
+    if not missing_keys:
+        return report
+
     pdf_paths = _list_remote_pdf_paths(config.hf_repo_id, hf_token=config.hf_token, verbose=config.verbose)
-    pdf_index, ambiguous_codes, scanned_pdf_files = _build_pdf_index(pdf_paths, verbose=config.verbose)
+    pdf_index, ambiguous_codes, scanned_pdf_files = _build_pdf_index(
+        pdf_paths,
+        needed_codes=set(missing_keys),
+        verbose=config.verbose,
+    )
     report.pdf_files_scanned = scanned_pdf_files
     report.pdf_codes_indexed = len(pdf_index)
     report.pdf_codes_ambiguous = len(ambiguous_codes)
 
-    pending_updates: list[dict[str, Any]] = []
+    pending_updates: list[tuple[str, str]] = []
 
     def _flush_updates() -> None:
-        nonlocal pending_updates
         if not pending_updates:
             return
         if config.dry_run:
             report.updates_applied += len(pending_updates)
-            pending_updates = []
+            pending_updates.clear()
             return
-        results = store.update_many(pending_updates)
+        results = store.update_many(
+            [{"record_key": record_key, "hf": {"path": relpath}} for record_key, relpath in pending_updates]
+        )
         report.updates_applied += len(results)
         report.batches_written += 1
-        pending_updates = []
-
-    for row in _iter_upload_rows(store.upload_dir):
-        report.upload_rows_scanned += 1
-
-        record_key = _normalize_text(row.get("record_key") or row.get("unique_code"))
-        if not record_key:
-            continue
-        if _has_hf_path(row):
-            continue
-
-        report.missing_hf_path_rows += 1
-
-        if record_key in ambiguous_codes:
-            report.skipped_ambiguous_pdf_code += 1
-            continue
-
-        relpath = pdf_index.get(record_key)
+        pending_updates.clear()
+
+    batch_size = max(1, config.batch_size)
+    pdf_get = pdf_index.get
+    append_update = pending_updates.append
+    for record_key in missing_keys:
+        # Ambiguous codes are removed from pdf_index, so a hit never needs the ambiguity check.
+        relpath = pdf_get(record_key)
         if not relpath:
-            report.skipped_no_pdf += 1
+            if record_key in ambiguous_codes:
+                report.skipped_ambiguous_pdf_code += 1
+            else:
+                report.skipped_no_pdf += 1
             continue
 
         report.candidate_rows_with_pdf += 1
-        pending_updates.append(
-            {
-                "record_key": record_key,
-                "hf": {"path": relpath},
-            }
-        )
+        append_update((record_key, relpath))
 
-        if len(pending_updates) >= max(1, config.batch_size):
+        if len(pending_updates) >= batch_size:
             _flush_updates()
 
     _flush_updates()
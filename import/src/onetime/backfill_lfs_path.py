@@ -4,8 +4,10 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 import re
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
@@ -16,6 +18,9 @@ from local_env import load_local_env
 LONG_DIGITS_RE = re.compile(r"\d{16,22}")
 SAFE_FILENAME_RE = re.compile(r"[^A-Za-z0-9._-]+")
 
+# Updated ledger rows are written with sorted keys so rewrites stay diff-stable.
+_ROW_ENCODER = json.JSONEncoder(ensure_ascii=False, sort_keys=True)
+
 
 @dataclass(frozen=True)
 class BackfillLfsPathConfig:
@@ -50,100 +55,163 @@ def configure_parser(parser: argparse.ArgumentParser) -> argparse.ArgumentParser
 
 
 def _safe_filename(value: str) -> str:
+    # Extracted unique codes are plain ASCII digits, which the regex would leave untouched.
+    if value.isascii() and value.isalnum():
+        return value
     text = SAFE_FILENAME_RE.sub("_", value).strip("_")
     return text or "unknown"
 
 
 def _extract_unique_code(value: Any) -> str:
     text = str(value or "").strip()
-    if not text:
+    # Neither the digit run nor the collected digits can reach 16 characters.
+    if len(text) < 16:
         return ""
+    if text.isdecimal():
+        return text[:22]
     match = LONG_DIGITS_RE.search(text)
     if match:
         return match.group(0)
-    digits = "".join(ch for ch in text if ch.isdigit())
-    if 16 <= len(digits) <= 22:
-        return digits
-    if len(digits) > 22:
-        return digits[:22]
-    return ""
+    digits = "".join(filter(str.isdigit, text))
+    if len(digits) < 16:
+        return ""
+    return digits[:22]
 
 
-def _year_month_from_gr_date(value: Any) -> str:
-    text = str(value or "").strip()
+@lru_cache(maxsize=16384)
+def _year_month_from_gr_date(value: str) -> str:
+    text = value.strip()
     if len(text) >= 10 and text[4] == "-" and text[7] == "-":
         return text[:7]
     return "unknown"
 
 
-def _resolve_existing_file(path_value: Any) -> Path | None:
+def _resolve_existing_file(path_value: Any, cwd: Path | None = None) -> str | None:
     text = str(path_value or "").strip()
     if not text:
         return None
     path = Path(text)
-    probe = path if path.is_absolute() else (Path.cwd() / path)
-    if probe.exists() and probe.is_file():
-        return probe
-    return None
+    probe = str(path if path.is_absolute() else ((cwd or Path.cwd()) / path))
+    # isfile() is one stat and is already False for missing paths.
+    return probe if os.path.isfile(probe) else None
+
 
+def _is_plain_path_part(text: str) -> bool:
+    return bool(text) and text not in (".", "..") and "/" not in text and os.sep not in text
 
-def _candidate_paths_from_record(record: dict[str, Any], lfs_pdf_roots: tuple[Path, ...]) -> list[Path]:
-    candidates: list[Path] = []
 
-    existing_lfs = _resolve_existing_file(record.get("lfs_path"))
+def _candidate_paths_from_record(
+    record: dict[str, Any],
+    lfs_pdf_roots: tuple[Path, ...],
+    cwd: Path | None = None,
+) -> tuple[list[str], list[str]]:
+    # Returns (paths already confirmed as files, root-built paths that still need checking).
+    existing: list[str] = []
+
+    existing_lfs = _resolve_existing_file(record.get("lfs_path"), cwd)
     if existing_lfs is not None:
-        candidates.append(existing_lfs)
+        existing.append(existing_lfs)
 
     download = record.get("download", {})
     if isinstance(download, dict):
-        existing_download = _resolve_existing_file(download.get("path"))
-        if existing_download is not None:
-            candidates.append(existing_download)
+        existing_download = _resolve_existing_file(download.get("path"), cwd)
+        if existing_download is not None and existing_download != existing_lfs:
+            existing.append(existing_download)
 
+    candidates: list[str] = []
     unique_code = _extract_unique_code(record.get("unique_code"))
     if unique_code:
         department_code = str(record.get("department_code") or "unknown").strip() or "unknown"
-        year_month = _year_month_from_gr_date(record.get("gr_date"))
+        year_month = _year_month_from_gr_date(str(record.get("gr_date") or ""))
         filename = f"{_safe_filename(unique_code)}.pdf"
-        for root in lfs_pdf_roots:
-            candidates.append(root / department_code / year_month / filename)
-
-    deduped: list[Path] = []
-    seen: set[Path] = set()
+        if _is_plain_path_part(department_code) and _is_plain_path_part(year_month):
+            join = os.path.join
+            for root in lfs_pdf_roots:
+                candidates.append(join(str(root), department_code, year_month, filename))
+        else:
+            # Let pathlib normalize separators and dot segments exactly as before.
+            for root in lfs_pdf_roots:
+                candidates.append(str(root / department_code / year_month / filename))
+
+    seen = set(existing)
+    deduped: list[str] = []
     for candidate in candidates:
         if candidate in seen:
             continue
         seen.add(candidate)
         deduped.append(candidate)
-    return deduped
+    return existing, deduped
+
 
+@dataclass(frozen=True)
+class LfsPdfListing:
+    unique_code_index: dict[str, Path]
+    pdf_files: frozenset[str]
+
+
+def _iter_pdf_entries(root: Path):
+    # Same pre-order walk as root.rglob("*.pdf"): symlinked and unreadable directories are skipped.
+    pending = [str(root)]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                listed = list(entries)
+        except OSError:
+            continue
+        subdirs: list[str] = []
+        for entry in listed:
+            if entry.name.endswith(".pdf"):
+                yield entry
+            try:
+                if entry.is_dir() and not entry.is_symlink():
+                    subdirs.append(entry.path)
+            except OSError:
+                continue
+        pending.extend(reversed(subdirs))
 
-def _build_unique_code_index(lfs_pdf_roots: tuple[Path, ...]) -> dict[str, Path]:
+
+def _scan_lfs_pdf_roots(lfs_pdf_roots: tuple[Path, ...]) -> LfsPdfListing:
     index: dict[str, Path] = {}
+    pdf_files: set[str] = set()
     for root in lfs_pdf_roots:
-        if not root.exists() or not root.is_dir():
+        if not root.is_dir():
             continue
-        for pdf_file in root.rglob("*.pdf"):
-            unique_code = _extract_unique_code(pdf_file.stem)
+        for entry in _iter_pdf_entries(root):
+            try:
+                if entry.is_file():
+                    pdf_files.add(entry.path)
+            except OSError:
+                pass
+            unique_code = _extract_unique_code(os.path.splitext(entry.name)[0])
             if not unique_code or unique_code in index:
                 continue
-            index[unique_code] = pdf_file
-    return index
+            index[unique_code] = Path(entry.path)
+    return LfsPdfListing(unique_code_index=index, pdf_files=frozenset(pdf_files))
+
+
+def _is_listed_file(text: str, listing: LfsPdfListing) -> bool:
+    # The scan only answers positively; anything it did not list is stat'ed.
+    return text in listing.pdf_files or os.path.isfile(text)
 
 
 def _resolve_lfs_path(
     record: dict[str, Any],
     lfs_pdf_roots: tuple[Path, ...],
-    indexed_pdf_paths: dict[str, Path],
+    listing: LfsPdfListing,
+    cwd: Path | None = None,
 ) -> str | None:
-    for candidate in _candidate_paths_from_record(record, lfs_pdf_roots):
-        if candidate.exists() and candidate.is_file():
+    existing, candidates = _candidate_paths_from_record(record, lfs_pdf_roots, cwd)
+    if existing:
+        return to_ledger_relative_path(existing[0])
+    for candidate in candidates:
+        if _is_listed_file(candidate, listing):
             return to_ledger_relative_path(candidate)
 
     unique_code = _extract_unique_code(record.get("unique_code"))
     if unique_code:
-        indexed = indexed_pdf_paths.get(unique_code)
-        if indexed is not None and indexed.exists() and indexed.is_file():
+        indexed = listing.unique_code_index.get(unique_code)
+        if indexed is not None and _is_listed_file(str(indexed), listing):
             return to_ledger_relative_path(indexed)
     return None
 
@@ -160,13 +228,10 @@ def _normalize_current_lfs_path(record: dict[str, Any]) -> str | None:
     return to_ledger_relative_path(text)
 
 
-def _atomic_write_jsonl(path: Path, rows: list[dict[str, Any]]) -> None:
+def _atomic_write_jsonl(path: Path, lines: list[bytes]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     temp_path = path.with_name(f".{path.name}.tmp")
-    with temp_path.open("w", encoding="utf-8") as handle:
-        for row in rows:
-            handle.write(json.dumps(row, ensure_ascii=False, sort_keys=True))
-            handle.write("\n")
+    temp_path.write_bytes(b"".join(line + b"\n" for line in lines))
     temp_path.replace(path)
 
 
@@ -175,52 +240,59 @@ def run_backfill_lfs_path(config: BackfillLfsPathConfig) -> BackfillLfsPathRepor
         raise FileNotFoundError(f"Ledger directory not found: {config.ledger_dir}")
 
     report = BackfillLfsPathReport()
-    indexed_pdf_paths = _build_unique_code_index(config.lfs_pdf_roots)
+    listing = _scan_lfs_pdf_roots(config.lfs_pdf_roots)
+    cwd = Path.cwd()
     now_text = utc_now_text()
+    encode = _ROW_ENCODER.encode
+
+    with os.scandir(config.ledger_dir) as entries:
+        ledger_names = sorted(entry.name for entry in entries if entry.name.endswith(".jsonl") and entry.is_file())
 
-    for ledger_file in sorted(config.ledger_dir.glob("*.jsonl")):
-        rows: list[dict[str, Any]] = []
+    for ledger_name in ledger_names:
+        ledger_file = config.ledger_dir / ledger_name
+        # Unchanged rows keep their original bytes; only updated rows are re-encoded.
+        lines: list[bytes] = []
         file_changed = False
 
-        with ledger_file.open("r", encoding="utf-8") as handle:
-            for line in handle:
-                text = line.strip()
-                if not text:
-                    continue
-                obj = json.loads(text)
-                if not isinstance(obj, dict):
-                    continue
-
-                report.scanned_records += 1
-                resolved_lfs_path = _resolve_lfs_path(
-                    record=obj,
-                    lfs_pdf_roots=config.lfs_pdf_roots,
-                    indexed_pdf_paths=indexed_pdf_paths,
-                )
-                if resolved_lfs_path is None:
-                    report.resolved_null += 1
-                else:
-                    report.resolved_non_null += 1
-
-                current_lfs_path = _normalize_current_lfs_path(obj)
-                if ("lfs_path" not in obj) or (current_lfs_path != resolved_lfs_path):
-                    if current_lfs_path is None and resolved_lfs_path is not None:
-                        report.set_non_null += 1
-                    if current_lfs_path is not None and resolved_lfs_path is None:
-                        report.cleared_to_null += 1
-                    obj["lfs_path"] = resolved_lfs_path
-                    obj["updated_at_utc"] = now_text
-                    report.updated_records += 1
-                    file_changed = True
-                else:
-                    report.unchanged_records += 1
-
-                rows.append(obj)
+        for line in ledger_file.read_bytes().splitlines():
+            if not line or line.isspace():
+                continue
+            # Decoding explicitly is cheaper than json.loads' per-call encoding detection on bytes.
+            obj = json.loads(line.decode("utf-8"))
+            if not isinstance(obj, dict):
+                continue
+
+            report.scanned_records += 1
+            resolved_lfs_path = _resolve_lfs_path(
+                record=obj,
+                lfs_pdf_roots=config.lfs_pdf_roots,
+                listing=listing,
+                cwd=cwd,
+            )
+            if resolved_lfs_path is None:
+                report.resolved_null += 1
+            else:
+                report.resolved_non_null += 1
+
+            current_lfs_path = _normalize_current_lfs_path(obj)
+            if ("lfs_path" not in obj) or (current_lfs_path != resolved_lfs_path):
+                if current_lfs_path is None and resolved_lfs_path is not None:
+                    report.set_non_null += 1
+                if current_lfs_path is not None and resolved_lfs_path is None:
+                    report.cleared_to_null += 1
+                obj["lfs_path"] = resolved_lfs_path
+                obj["updated_at_utc"] = now_text
+                report.updated_records += 1
+                file_changed = True
+                lines.append(encode(obj).encode("utf-8"))
+            else:
+                report.unchanged_records += 1
+                lines.append(line)
 
         if file_changed:
             report.partitions_changed += 1
             if not config.dry_run:
-                _atomic_write_jsonl(ledger_file, rows)
+                _atomic_write_jsonl(ledger_file, lines)
 
     return report
 
@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 import argparse
-import hashlib
 import os
 import re
 import shutil
@@ -15,6 +14,7 @@ from typing import Any
 from department_codes import department_code_from_name
 from import_config import load_import_config
 from info_store import InfoStore as LedgerStore
+from job_utils import sha1_file
 from ledger_engine import to_ledger_relative_path
 from local_env import load_local_env
 from sync_hf_job import SyncHFConfig, SyncHFError, resolve_hf_repo_path, run_sync_hf
@@ -87,17 +87,6 @@ def year_month_from_gr_date(gr_date: Any) -> str:
     return "unknown"
 
 
-def sha1_file(file_path: Path) -> str:
-    digest = hashlib.sha1()
-    with file_path.open("rb") as handle:
-        while True:
-            chunk = handle.read(1024 * 1024)
-            if not chunk:
-                break
-            digest.update(chunk)
-    return digest.hexdigest().upper()
-
-
 def iter_pdf_files(source_dir: Path, recursive: bool) -> list[Path]:
     if recursive:
         return sorted(path for path in source_dir.rglob("*") if path.is_file())
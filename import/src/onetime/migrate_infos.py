@@ -5,12 +5,14 @@ from __future__ import annotations
 import argparse
 import hashlib
 import json
+import os
 import re
 import shutil
 import time
 import unicodedata
 from collections import Counter
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Iterator, TextIO
 from urllib.parse import unquote
@@ -27,6 +29,18 @@ ALLOWED_WAYBACK_STATUS = {"not_attempted", "success", "failed"}
 ALLOWED_ARCHIVE_STATUS = {"not_attempted", "success", "failed"}
 ALLOWED_PDF_STATUS = {"not_attempted", "success", "failed", "missing_pdf"}
 DROP_PDF_FONT_FIELDS = {"basefont", "encoding", "ext", "font_num", "referencer", "resource_name"}
+# _normalize_pdf_fonts drops these and writes back a normalized word_count.
+_FONT_KEYS_TO_REBUILD = DROP_PDF_FONT_FIELDS | {"words", "word_count"}
+
+# Built once: json.dumps() with non-default options constructs a new encoder on every call.
+_ROW_ENCODER = json.JSONEncoder(ensure_ascii=False, sort_keys=True)
+# url and upload rows have a fixed schema built in key order; pdf rows carry source dicts
+# (fonts, language) and still need sorting.
+_PRESORTED_ROW_ENCODER = json.JSONEncoder(ensure_ascii=False)
+# Encoded rows are buffered per output file and written in batches of this many lines.
+_WRITE_BATCH_ROWS = 4096
+# gr_date values repeat across thousands of rows; callers pass str only.
+_partition_for_gr_date_text = lru_cache(maxsize=4096)(partition_for_gr_date)
 
 
 class MigrationError(Exception):
@@ -98,44 +112,54 @@ def _partition_sort_key(file_path: Path) -> tuple[int, int, str]:
 
 
 def _list_source_files(source_dir: Path) -> list[Path]:
-    files = sorted(source_dir.glob("*.jsonl"), key=_partition_sort_key)
-    return [path for path in files if path.is_file()]
+    with os.scandir(source_dir) as entries:
+        files = [Path(entry.path) for entry in entries if entry.name.endswith(".jsonl") and entry.is_file()]
+    return sorted(files, key=_partition_sort_key)
 
 
 def _require_target_empty(target_dir: Path, label: str) -> None:
     if target_dir.exists() and not target_dir.is_dir():
         raise MigrationError(f"{label} target exists but is not a directory: {target_dir}")
     if target_dir.exists():
-        existing_jsonl = sorted(target_dir.glob("*.jsonl"))
+        with os.scandir(target_dir) as entries:
+            existing_jsonl = sum(1 for entry in entries if entry.name.endswith(".jsonl"))
         if existing_jsonl:
             raise MigrationError(
-                f"{label} target already contains JSONL files ({len(existing_jsonl)}): {target_dir}"
+                f"{label} target already contains JSONL files ({existing_jsonl}): {target_dir}"
             )
 
 
 def _iter_source_rows(source_files: list[Path]) -> Iterator[tuple[Path, int, dict[str, Any]]]:
     for file_path in source_files:
-        with file_path.open("r", encoding="utf-8") as handle:
-            for line_no, line in enumerate(handle, start=1):
-                text = line.strip()
+        # bytes.splitlines() breaks on the same \n, \r and \r\n endings as text-mode iteration.
+        for line_no, line in enumerate(file_path.read_bytes().splitlines(), start=1):
+            if not line:
+                continue
+            text = line.decode("utf-8")
+            try:
+                obj = json.loads(text)
+            except json.JSONDecodeError:
+                # Whitespace-only lines and non-JSON padding; strip only on this rare path.
+                text = text.strip()
                 if not text:
                     continue
                 try:
                     obj = json.loads(text)
                 except json.JSONDecodeError as exc:
                     raise MigrationError(f"Invalid JSON in {file_path}:{line_no}: {exc}") from exc
-                if not isinstance(obj, dict):
-                    raise MigrationError(f"Expected JSON object in {file_path}:{line_no}")
-                yield file_path, line_no, obj
+            if not isinstance(obj, dict):
+                raise MigrationError(f"Expected JSON object in {file_path}:{line_no}")
+            yield file_path, line_no, obj
 
 
 def _non_empty_text(value: Any, default: str = "") -> str:
-    text = str(value or "").strip()
+    # Source values are almost always str already; skip the str(value or "") call for them.
+    text = value.strip() if type(value) is str else str(value or "").strip()
     return text if text else default
 
 
 def _optional_text(value: Any) -> str | None:
-    text = str(value or "").strip()
+    text = value.strip() if type(value) is str else str(value or "").strip()
     return text if text else None
 
 
@@ -154,6 +178,12 @@ def _int_or_none(value: Any) -> int | None:
     return None
 
 
+def _attempt_count(value: Any) -> int:
+    # Attempt counters are clamped to >= 0 and default to 0; plain ints skip the parse.
+    parsed = value if type(value) is int else _int_or_none(value)
+    return parsed if parsed is not None and parsed > 0 else 0
+
+
 def _bool_or_none(value: Any) -> bool | None:
     if isinstance(value, bool):
         return value
@@ -166,6 +196,10 @@ def _bool_or_none(value: Any) -> bool | None:
     return None
 
 
+def _dict_or_empty(value: Any) -> dict[str, Any]:
+    return value if isinstance(value, dict) else {}
+
+
 def _status(value: Any, allowed: set[str], default: str) -> str:
     text = _non_empty_text(value, default)
     return text if text in allowed else default
@@ -175,6 +209,11 @@ def _source_timestamp(row: dict[str, Any], key: str, fallback: str) -> str:
     return _non_empty_text(row.get(key), fallback)
 
 
+def _source_timestamps(row: dict[str, Any], now_text: str) -> tuple[str, str]:
+    created_at = _source_timestamp(row, "created_at_utc", now_text)
+    return created_at, _source_timestamp(row, "updated_at_utc", created_at)
+
+
 def _normalized_font_word_count(font_obj: dict[str, Any]) -> int | None:
     value = font_obj.get("word_count")
     if value is None and "words" in font_obj:
@@ -193,11 +232,9 @@ def _normalize_pdf_fonts(fonts_obj: Any) -> dict[str, dict[str, Any]] | None:
     for font_key, font_value in fonts_obj.items():
         if not isinstance(font_value, dict):
             continue
-        out_font: dict[str, Any] = {}
-        for key, value in font_value.items():
-            if key in DROP_PDF_FONT_FIELDS or key in {"words", "word_count"}:
-                continue
-            out_font[key] = value
+        out_font = {
+            key: value for key, value in font_value.items() if key not in _FONT_KEYS_TO_REBUILD
+        }
         word_count = _normalized_font_word_count(font_value)
         if word_count is not None:
             out_font["word_count"] = word_count
@@ -207,21 +244,29 @@ def _normalize_pdf_fonts(fonts_obj: Any) -> dict[str, dict[str, Any]] | None:
 
 
 def _ascii_slug(value: str) -> str:
-    text = unicodedata.normalize("NFKD", value).encode("ascii", "ignore").decode("ascii")
+    # ASCII text is unchanged by NFKD, so only non-ASCII input needs the normalize round-trip.
+    if value.isascii():
+        text = value
+    else:
+        text = unicodedata.normalize("NFKD", value).encode("ascii", "ignore").decode("ascii")
     text = SAFE_TEXT_RE.sub("_", text).strip("_")
     return text
 
 
 def _record_key_from_row(row: dict[str, Any], file_path: Path, line_no: int) -> str:
     unique_text = _non_empty_text(row.get("unique_code"), "")
+    # Plain 16-22 digit codes are the common case; LONG_DIGITS_RE would match them whole.
+    if 16 <= len(unique_text) <= 22 and unique_text.isdecimal():
+        return unique_text
+    match = LONG_DIGITS_RE.search(unique_text)
+    if match:
+        return match.group(0)
     source_url = unquote(_non_empty_text(row.get("source_url"), ""))
+    match = LONG_DIGITS_RE.search(source_url)
+    if match:
+        return match.group(0)
 
-    for candidate in (unique_text, source_url):
-        match = LONG_DIGITS_RE.search(candidate)
-        if match:
-            return match.group(0)
-
-    digits_only = "".join(ch for ch in unique_text if ch.isdigit())
+    digits_only = "".join(filter(str.isdigit, unique_text))
     if len(digits_only) >= 18:
         return digits_only[:18]
     if len(digits_only) >= 16:
@@ -232,6 +277,8 @@ def _record_key_from_row(row: dict[str, Any], file_path: Path, line_no: int) ->
         slug = _ascii_slug(fallback)
         if slug:
             return slug
+        # Only reached when no ASCII slug survives. The digest becomes a persisted record_key,
+        # so it stays sha1: a faster 32-bit checksum would change existing keys and collide.
         digest = hashlib.sha1(fallback.encode("utf-8")).hexdigest()[:20]
         return f"ucode_{digest}"
 
@@ -240,13 +287,13 @@ def _record_key_from_row(row: dict[str, Any], file_path: Path, line_no: int) ->
     )
 
 
-def _canonical_department_code(row: dict[str, Any]) -> str:
-    code_raw = _non_empty_text(row.get("department_code"), "")
+@lru_cache(maxsize=8192)
+def _canonical_department_code(code_raw: str, name_raw: str) -> str:
+    # Called with already-stripped text; the handful of distinct departments repeat on every row.
     if code_raw:
         lower_code = code_raw.lower()
         if lower_code in DEPARTMENT_CODE_TO_NAME:
             return lower_code
-    name_raw = _non_empty_text(row.get("department_name"), "")
     if name_raw:
         return department_code_from_name(name_raw)
     if code_raw:
@@ -254,94 +301,95 @@ def _canonical_department_code(row: dict[str, Any]) -> str:
     return "unknown"
 
 
-def _build_urlinfo_row(row: dict[str, Any], record_key: str, now_text: str) -> dict[str, Any]:
-    created_at = _source_timestamp(row, "created_at_utc", now_text)
-    updated_at = _source_timestamp(row, "updated_at_utc", created_at)
+def _build_urlinfo_row(
+    row: dict[str, Any], record_key: str, created_at: str, updated_at: str
+) -> dict[str, Any]:
+    get = row.get
+    department_name = _non_empty_text(get("department_name"), "")
+    department_code = _non_empty_text(get("department_code"), "")
+    # Keys are listed in sorted order so the row can be encoded without sort_keys.
     return {
+        "created_at_utc": created_at,
+        "department_code": _canonical_department_code(department_code, department_name),
+        "department_name": department_name,
+        "first_seen_crawl_date": _non_empty_text(get("first_seen_crawl_date"), ""),
+        "first_seen_run_type": _non_empty_text(get("first_seen_run_type"), "daily"),
+        "gr_date": _non_empty_text(get("gr_date"), ""),
+        "last_seen_crawl_date": _non_empty_text(get("last_seen_crawl_date"), ""),
         "record_key": record_key,
+        "source_url": _non_empty_text(get("source_url"), ""),
+        "title": _non_empty_text(get("title"), ""),
         "unique_code": record_key,
-        "title": _non_empty_text(row.get("title"), ""),
-        "department_name": _non_empty_text(row.get("department_name"), ""),
-        "department_code": _canonical_department_code(row),
-        "gr_date": _non_empty_text(row.get("gr_date"), ""),
-        "source_url": _non_empty_text(row.get("source_url"), ""),
-        "first_seen_crawl_date": _non_empty_text(row.get("first_seen_crawl_date"), ""),
-        "last_seen_crawl_date": _non_empty_text(row.get("last_seen_crawl_date"), ""),
-        "first_seen_run_type": _non_empty_text(row.get("first_seen_run_type"), "daily"),
-        "created_at_utc": created_at,
         "updated_at_utc": updated_at,
     }
 
 
-def _build_uploadinfo_row(row: dict[str, Any], record_key: str, now_text: str) -> dict[str, Any]:
-    created_at = _source_timestamp(row, "created_at_utc", now_text)
-    updated_at = _source_timestamp(row, "updated_at_utc", created_at)
-
-    attempts_src = row.get("attempt_counts") if isinstance(row.get("attempt_counts"), dict) else {}
-    download_attempts = _int_or_none(attempts_src.get("download"))
-    wayback_attempts = _int_or_none(attempts_src.get("wayback"))
-    archive_attempts = _int_or_none(attempts_src.get("archive"))
+def _build_uploadinfo_row(
+    row: dict[str, Any], record_key: str, created_at: str, updated_at: str
+) -> dict[str, Any]:
+    get = row.get
+    attempts_src = _dict_or_empty(get("attempt_counts"))
+    download_attempts = _attempt_count(attempts_src.get("download"))
+    wayback_attempts = _attempt_count(attempts_src.get("wayback"))
+    archive_attempts = _attempt_count(attempts_src.get("archive"))
+    # The legacy "lfs" counter is only consulted when "hf" does not parse at all.
     hf_attempts = _int_or_none(attempts_src.get("hf"))
     if hf_attempts is None:
         hf_attempts = _int_or_none(attempts_src.get("lfs"))
+    hf_attempts = _attempt_count(hf_attempts)
 
-    download_attempts = max(0, download_attempts) if download_attempts is not None else 0
-    wayback_attempts = max(0, wayback_attempts) if wayback_attempts is not None else 0
-    archive_attempts = max(0, archive_attempts) if archive_attempts is not None else 0
-    hf_attempts = max(0, hf_attempts) if hf_attempts is not None else 0
-
-    download_src = row.get("download") if isinstance(row.get("download"), dict) else {}
-    wayback_src = row.get("wayback") if isinstance(row.get("wayback"), dict) else {}
-    archive_src = row.get("archive") if isinstance(row.get("archive"), dict) else {}
+    download_src = _dict_or_empty(get("download"))
+    wayback_src = _dict_or_empty(get("wayback"))
+    archive_src = _dict_or_empty(get("archive"))
 
-    hf_path = _optional_text(row.get("lfs_path"))
+    hf_path = _optional_text(get("lfs_path"))
     hf_status = "success" if hf_path else "not_attempted"
 
+    # Keys (including nested ones) are listed in sorted order so the row can be encoded
+    # without sort_keys.
     return {
-        "record_key": record_key,
-        "state": _non_empty_text(row.get("state"), "FETCHED"),
-        "download": {
-            "status": _status(download_src.get("status"), ALLOWED_DOWNLOAD_STATUS, "not_attempted"),
-            "error": _non_empty_text(download_src.get("error"), ""),
-            "attempts": download_attempts,
-        },
-        "wayback": {
-            "status": _status(wayback_src.get("status"), ALLOWED_WAYBACK_STATUS, "not_attempted"),
-            "url": _non_empty_text(wayback_src.get("url"), ""),
-            "content_url": _non_empty_text(wayback_src.get("content_url"), ""),
-            "archive_time": _non_empty_text(wayback_src.get("archive_time"), ""),
-            "archive_sha1": _non_empty_text(wayback_src.get("archive_sha1"), ""),
-            "archive_length": _int_or_none(wayback_src.get("archive_length")),
-            "archive_mimetype": _non_empty_text(wayback_src.get("archive_mimetype"), ""),
-            "archive_status_code": _non_empty_text(wayback_src.get("archive_status_code"), ""),
-            "error": _non_empty_text(wayback_src.get("error"), ""),
-            "attempts": wayback_attempts,
-        },
         "archive": {
-            "status": _status(archive_src.get("status"), ALLOWED_ARCHIVE_STATUS, "not_attempted"),
+            "attempts": archive_attempts,
+            "error": _non_empty_text(archive_src.get("error"), ""),
             "identifier": _non_empty_text(archive_src.get("identifier"), ""),
+            "status": _status(archive_src.get("status"), ALLOWED_ARCHIVE_STATUS, "not_attempted"),
             "url": _non_empty_text(archive_src.get("url"), ""),
-            "error": _non_empty_text(archive_src.get("error"), ""),
-            "attempts": archive_attempts,
+        },
+        "created_at_utc": created_at,
+        "download": {
+            "attempts": download_attempts,
+            "error": _non_empty_text(download_src.get("error"), ""),
+            "status": _status(download_src.get("status"), ALLOWED_DOWNLOAD_STATUS, "not_attempted"),
         },
         "hf": {
-            "status": hf_status,
-            "path": hf_path,
-            "hash": None,
+            "attempts": hf_attempts,
             "backend": None,
             "commit_hash": None,
             "error": None,
+            "hash": None,
+            "path": hf_path,
+            "status": hf_status,
             "synced_at_utc": updated_at if hf_path else None,
-            "attempts": hf_attempts,
         },
-        "created_at_utc": created_at,
+        "record_key": record_key,
+        "state": _non_empty_text(get("state"), "FETCHED"),
         "updated_at_utc": updated_at,
+        "wayback": {
+            "archive_length": _int_or_none(wayback_src.get("archive_length")),
+            "archive_mimetype": _non_empty_text(wayback_src.get("archive_mimetype"), ""),
+            "archive_sha1": _non_empty_text(wayback_src.get("archive_sha1"), ""),
+            "archive_status_code": _non_empty_text(wayback_src.get("archive_status_code"), ""),
+            "archive_time": _non_empty_text(wayback_src.get("archive_time"), ""),
+            "attempts": wayback_attempts,
+            "content_url": _non_empty_text(wayback_src.get("content_url"), ""),
+            "error": _non_empty_text(wayback_src.get("error"), ""),
+            "status": _status(wayback_src.get("status"), ALLOWED_WAYBACK_STATUS, "not_attempted"),
+            "url": _non_empty_text(wayback_src.get("url"), ""),
+        },
     }
 
 
-def _build_pdfinfo_row(row: dict[str, Any], record_key: str, now_text: str) -> dict[str, Any]:
-    created_at = _source_timestamp(row, "created_at_utc", now_text)
-
+def _build_pdfinfo_row(row: dict[str, Any], record_key: str, created_at: str) -> dict[str, Any]:
     base: dict[str, Any] = {
         "record_key": record_key,
         "status": "not_attempted",
@@ -381,28 +429,11 @@ def _build_pdfinfo_row(row: dict[str, Any], record_key: str, now_text: str) -> d
     out["total_font_count"] = _int_or_none(total_font_count)
     out["fonts"] = _normalize_pdf_fonts(pdf_src.get("fonts"))
     out["unresolved_word_count"] = _int_or_none(pdf_src.get("unresolved_word_count"))
-    out["language"] = pdf_src.get("language") if isinstance(pdf_src.get("language"), dict) else None
+    language = pdf_src.get("language")
+    out["language"] = language if isinstance(language, dict) else None
     return out
 
 
-def _scan_source(source_files: list[Path], report: MigrateInfosReport) -> None:
-    seen_locations: dict[str, tuple[Path, int]] = {}
-    for file_path, line_no, row in _iter_source_rows(source_files):
-        record_key = _record_key_from_row(row, file_path, line_no)
-        previous = seen_locations.get(record_key)
-        if previous is not None:
-            prev_file, prev_line = previous
-            raise MigrationError(
-                f"Duplicate record_key={record_key} at {file_path}:{line_no} "
-                f"(first seen at {prev_file}:{prev_line})"
-            )
-        seen_locations[record_key] = (file_path, line_no)
-        report.source_rows += 1
-        partition = partition_for_gr_date(row.get("gr_date"))
-        report.source_partition_counts[partition] += 1
-    report.unique_codes = len(seen_locations)
-
-
 def _open_partition_writer(
     root: Path,
     partition: str,
@@ -418,6 +449,18 @@ def _open_partition_writer(
     return handle
 
 
+def _flush_pending_lines(
+    root: Path,
+    partition: str,
+    lines: list[str],
+    handle_cache: dict[Path, TextIO],
+) -> None:
+    if not lines:
+        return
+    _open_partition_writer(root, partition, handle_cache).write("\n".join(lines) + "\n")
+    lines.clear()
+
+
 def _close_all_handles(handle_cache: dict[Path, TextIO]) -> None:
     for handle in handle_cache.values():
         handle.close()
@@ -438,11 +481,16 @@ def run_migrate_infos(config: MigrateInfosConfig) -> MigrateInfosReport:
 
     report = MigrateInfosReport(dry_run=config.dry_run)
     report.source_files = len(source_files)
-    _scan_source(source_files, report)
 
     now_text = utc_now_text()
     temp_root: Path | None = None
     handle_cache: dict[Path, TextIO] = {}
+    # Per partition: pending url, upload and pdf lines, which always grow in lockstep.
+    pending_lines: dict[str, tuple[list[str], list[str], list[str]]] = {}
+    # Every source row yields exactly one url, upload and pdf row in the same partition,
+    # so a single per-partition tally backs all four report counters.
+    partition_counts: dict[str, int] = {}
+    seen_locations: dict[str, tuple[Path, int]] = {}
 
     try:
         if not config.dry_run:
@@ -454,47 +502,75 @@ def run_migrate_infos(config: MigrateInfosConfig) -> MigrateInfosReport:
             url_temp_root = Path("/dev/null")
             upload_temp_root = Path("/dev/null")
             pdf_temp_root = Path("/dev/null")
+        temp_roots = (url_temp_root, upload_temp_root, pdf_temp_root)
 
+        encode_sorted = _ROW_ENCODER.encode
+        encode_presorted = _PRESORTED_ROW_ENCODER.encode
         for file_path, line_no, row in _iter_source_rows(source_files):
             record_key = _record_key_from_row(row, file_path, line_no)
-            partition = partition_for_gr_date(row.get("gr_date"))
-
-            url_row = _build_urlinfo_row(row, record_key, now_text)
-            upload_row = _build_uploadinfo_row(row, record_key, now_text)
-            pdf_row = _build_pdfinfo_row(row, record_key, now_text)
-
-            report.url_rows += 1
-            report.upload_rows += 1
-            report.pdf_rows += 1
-            report.url_partition_counts[partition] += 1
-            report.upload_partition_counts[partition] += 1
-            report.pdf_partition_counts[partition] += 1
+            # Duplicates are detected in the same pass as the writes; anything already written
+            # lives under temp_root and is discarded below when this raises.
+            previous = seen_locations.get(record_key)
+            if previous is not None:
+                prev_file, prev_line = previous
+                raise MigrationError(
+                    f"Duplicate record_key={record_key} at {file_path}:{line_no} "
+                    f"(first seen at {prev_file}:{prev_line})"
+                )
+            seen_locations[record_key] = (file_path, line_no)
+            gr_date = row.get("gr_date")
+            # Non-str gr_date values map to "unknown", exactly as "" does.
+            partition = _partition_for_gr_date_text(gr_date if isinstance(gr_date, str) else "")
+            partition_counts[partition] = partition_counts.get(partition, 0) + 1
+
+            # Timestamps are shared by all three namespaces, so resolve them once per row.
+            created_at, updated_at = _source_timestamps(row, now_text)
+            url_row = _build_urlinfo_row(row, record_key, created_at, updated_at)
+            upload_row = _build_uploadinfo_row(row, record_key, created_at, updated_at)
+            pdf_row = _build_pdfinfo_row(row, record_key, created_at)
 
             if config.dry_run:
                 continue
 
-            url_handle = _open_partition_writer(url_temp_root, partition, handle_cache)
-            url_handle.write(json.dumps(url_row, ensure_ascii=False, sort_keys=True))
-            url_handle.write("\n")
-
-            upload_handle = _open_partition_writer(upload_temp_root, partition, handle_cache)
-            upload_handle.write(json.dumps(upload_row, ensure_ascii=False, sort_keys=True))
-            upload_handle.write("\n")
-
-            pdf_handle = _open_partition_writer(pdf_temp_root, partition, handle_cache)
-            pdf_handle.write(json.dumps(pdf_row, ensure_ascii=False, sort_keys=True))
-            pdf_handle.write("\n")
-
+            batch = pending_lines.get(partition)
+            if batch is None:
+                batch = pending_lines[partition] = ([], [], [])
+            url_lines, upload_lines, pdf_lines = batch
+            url_lines.append(encode_presorted(url_row))
+            upload_lines.append(encode_presorted(upload_row))
+            pdf_lines.append(encode_sorted(pdf_row))
+            if len(url_lines) >= _WRITE_BATCH_ROWS:
+                for temp_dir, lines in zip(temp_roots, batch):
+                    _flush_pending_lines(temp_dir, partition, lines, handle_cache)
+
+        for partition, batch in pending_lines.items():
+            for temp_dir, lines in zip(temp_roots, batch):
+                _flush_pending_lines(temp_dir, partition, lines, handle_cache)
         _close_all_handles(handle_cache)
+        report.unique_codes = len(seen_locations)
+        report.source_rows = sum(partition_counts.values())
+        report.url_rows = report.upload_rows = report.pdf_rows = report.source_rows
+        for counter in (
+            report.source_partition_counts,
+            report.url_partition_counts,
+            report.upload_partition_counts,
+            report.pdf_partition_counts,
+        ):
+            counter.update(partition_counts)
 
         if not config.dry_run and temp_root is not None:
+            # Every partition seen in the pass has one file per namespace, so no listing is needed.
+            written_partitions = sorted(
+                partition_counts, key=lambda value: _partition_sort_key(Path(f"{value}.jsonl"))
+            )
             for namespace, temp_dir, target_dir in (
                 ("urlinfos", temp_root / "urlinfos", config.urlinfos_dir),
                 ("uploadinfos", temp_root / "uploadinfos", config.uploadinfos_dir),
                 ("pdfinfos", temp_root / "pdfinfos", config.pdfinfos_dir),
             ):
                 target_dir.mkdir(parents=True, exist_ok=True)
-                for temp_file in sorted(temp_dir.glob("*.jsonl"), key=_partition_sort_key):
+                for partition in written_partitions:
+                    temp_file = temp_dir / f"{partition}.jsonl"
                     final_path = target_dir / temp_file.name
                     if final_path.exists():
                         raise MigrationError(
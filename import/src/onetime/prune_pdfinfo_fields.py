@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 import sys
 from dataclasses import dataclass
 from pathlib import Path
@@ -17,6 +18,10 @@ except ModuleNotFoundError:
 
 
 DROP_FONT_FIELDS = {"basefont", "encoding", "ext", "font_num", "referencer", "resource_name"}
+# _scrub_font_obj re-adds word_count after filtering.
+_FONT_KEYS_TO_REBUILD = DROP_FONT_FIELDS | {"words", "word_count"}
+
+_ROW_ENCODER = json.JSONEncoder(ensure_ascii=False, sort_keys=True)
 
 
 @dataclass
@@ -65,13 +70,8 @@ def _normalized_font_word_count(font_obj: dict[str, Any]) -> int | None:
 
 
 def _scrub_font_obj(font_obj: dict[str, Any]) -> tuple[dict[str, Any] | None, bool]:
-    changed = False
-    out_font: dict[str, Any] = {}
-    for key, value in font_obj.items():
-        if key in DROP_FONT_FIELDS or key in {"words", "word_count"}:
-            changed = True
-            continue
-        out_font[key] = value
+    out_font = {key: value for key, value in font_obj.items() if key not in _FONT_KEYS_TO_REBUILD}
+    changed = len(out_font) != len(font_obj)
 
     word_count = _normalized_font_word_count(font_obj)
     if word_count is None:
@@ -88,14 +88,9 @@ def _scrub_font_obj(font_obj: dict[str, Any]) -> tuple[dict[str, Any] | None, bo
 def _scrub_row(row: dict[str, Any], report: PruneReport) -> bool:
     changed = False
 
-    removed_updated = False
-    if "updated_at_utc" in row:
+    if "updated_at_utc" in row or "updated_at" in row:
         row.pop("updated_at_utc", None)
-        removed_updated = True
-    if "updated_at" in row:
         row.pop("updated_at", None)
-        removed_updated = True
-    if removed_updated:
         report.updated_at_removed += 1
         changed = True
 
@@ -135,24 +130,33 @@ def _process_file(file_path: Path, *, dry_run: bool, verbose: bool, report: Prun
     lines_out: list[str] = []
     file_changed = False
 
-    with file_path.open("r", encoding="utf-8") as handle:
-        for line_no, line in enumerate(handle, start=1):
-            text = line.strip()
+    encode = _ROW_ENCODER.encode
+    for line_no, line in enumerate(file_path.read_bytes().splitlines(), start=1):
+        if not line:
+            continue
+        text = line.decode("utf-8")
+        try:
+            row = json.loads(text)
+        except json.JSONDecodeError:
+            text = text.strip()
             if not text:
                 continue
             try:
                 row = json.loads(text)
             except json.JSONDecodeError as exc:
                 raise ValueError(f"Invalid JSON in {file_path}:{line_no}: {exc}") from exc
-            if not isinstance(row, dict):
-                raise ValueError(f"Expected JSON object in {file_path}:{line_no}")
-
-            report.rows_scanned += 1
-            row_changed = _scrub_row(row, report)
-            if row_changed:
-                report.rows_updated += 1
-                file_changed = True
-            lines_out.append(json.dumps(row, ensure_ascii=False, sort_keys=True))
+        if not isinstance(row, dict):
+            raise ValueError(f"Expected JSON object in {file_path}:{line_no}")
+
+        report.rows_scanned += 1
+        row_changed = _scrub_row(row, report)
+        if row_changed:
+            report.rows_updated += 1
+            file_changed = True
+        if not dry_run:
+            # A dry run only reports counts, so skip serializing rows that are never written.
+            # Unchanged rows keep their original text; only scrubbed rows are re-encoded.
+            lines_out.append(encode(row) if row_changed else text.strip())
 
     report.files_scanned += 1
     if not file_changed:
@@ -166,9 +170,7 @@ def _process_file(file_path: Path, *, dry_run: bool, verbose: bool, report: Prun
 
     temp_path = file_path.with_name(f".{file_path.name}.tmp")
     with temp_path.open("w", encoding="utf-8") as handle:
-        for line in lines_out:
-            handle.write(line)
-            handle.write("\n")
+        handle.write("\n".join(lines_out) + "\n")
     temp_path.replace(file_path)
 
 
@@ -194,7 +196,9 @@ def run_from_args(args: argparse.Namespace) -> int:
         print(f"pdfinfos directory not found: {pdfinfos_dir}")
         return 2
 
-    files = sorted((path for path in pdfinfos_dir.glob("*.jsonl") if path.is_file()), key=_partition_sort_key)
+    with os.scandir(pdfinfos_dir) as entries:
+        files = [Path(entry.path) for entry in entries if entry.name.endswith(".jsonl") and entry.is_file()]
+    files.sort(key=_partition_sort_key)
     report = PruneReport()
     for file_path in files:
         _process_file(file_path, dry_run=args.dry_run, verbose=args.verbose, report=report)